@@ -1,71 +1,94 @@
 # Copyright (c) HashiCorp, Inc.
 # SPDX-License-Identifier: MIT
 
+import functools
 import logging
 import os
 import uuid
-from threading import Thread
-from typing import Optional
 
 import streamlit as st
 from langchain.base_language import BaseLanguageModel
-from langchain_community.cache import SQLiteCache
 from langchain_community.utilities import SQLDatabase
 from langchain_core.globals import set_llm_cache
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_experimental.sql import SQLDatabaseChain
 from langchain_openai.chat_models.base import ChatOpenAI
-from streamlit.runtime.scriptrunner import (
-    ScriptRunContext,
-    add_script_run_ctx,
-    get_script_run_ctx,
-)
+from langchain_openai.embeddings import OpenAIEmbeddings
+from sqlalchemy import create_engine
 
+from . import SYSTEM_PROMPT, USER_TEMPLATE
+from .cache import SemanticResponseCache, WALSQLiteCache
 from .interface import run_streamlit
-from .vault import DynamicDatabaseSecret, get_vault_client
+from .vault import DynamicDatabaseSecret, correlation_id, get_vault_client
 
 # Demo only, configuration should not be hardcoded
 VAULT_AGENT_OPENAI_KEY_PATH = "/vault/secrets/openai-token"
 PSQL_URI = "postgresql+psycopg2://{username}:{password}@{host}/{database}"
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+QA_CACHE_PATH = "qa_cache.db"
+# Minimum cosine similarity for answering from a similar cached question
+QA_CACHE_THRESHOLD = float(os.environ.get("QA_CACHE_THRESHOLD", "0.99"))
+REQUIRED_ENV_VARS = ("VAULT_ADDR", "VAULT_DB_ROLE", "DB_HOST", "DB_NAME")
+
+# Streamlit re-executes this module on reload, so only configure the root logger
+# once. DEBUG is opt-in: LangChain logs full prompts at that level.
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
 
 
 def main():
-    # Check that all required environment variables are set
-    for env_var in ["VAULT_ADDR", "VAULT_DB_ROLE", "DB_HOST", "DB_NAME"]:
-        if env_var not in os.environ.keys():
-            raise ValueError(f"Please set the {env_var} environment variable.")
+    # Check that all required environment variables are set, once per session
+    if not st.session_state.get("_env_ok"):
+        missing = [v for v in REQUIRED_ENV_VARS if not os.environ.get(v)]
+        if missing:
+            raise ValueError(
+                f"Please set the following environment variables: {', '.join(missing)}"
+            )
+        st.session_state["_env_ok"] = True
 
     # Initialize Streamlit session state
     st_init_session()
 
-    # Instantiate the Vault client and ensure that the session ID is passed through
-    # as a correlation ID. We could use other headers, but Vault tracks correlation IDs
-    # in audit logs by default, so it's an easier choice for demo purposes.
-    vault_client = get_vault_client(
-        vault_addr=os.environ["VAULT_ADDR"],
-        correlation_id=st.session_state.session_id,
-    )
-
-    # Generate short-lived dynamic credentials for the database and start the renewal
-    # thread in the background.
-    if st.session_state.db_creds is None:
-        st_context = get_script_run_ctx()
-        st.session_state.db_creds = DynamicDatabaseSecret(
-            client=vault_client,
-            role_name=os.environ["VAULT_DB_ROLE"],
-            mount_point=os.environ.get("VAULT_DB_MOUNT", "database"),
-            callback=lambda creds, thread=None: _update_db_client(
-                creds, thread, st_context
-            ),
+    # Tag the Vault requests of this run with the session ID as a correlation ID,
+    # including those of the renewals started here. We could use other headers, but
+    # Vault tracks correlation IDs in audit logs by default, so it's an easier choice
+    # for demo purposes.
+    with correlation_id(st.session_state.session_id):
+        vault_client = get_vault_client(vault_addr=os.environ["VAULT_ADDR"])
+
+        # Generate short-lived dynamic credentials for the database and start renewing
+        # them in the background.
+        if st.session_state.db_creds is None:
+            st.session_state.db_creds = DynamicDatabaseSecret(
+                client=vault_client,
+                role_name=os.environ["VAULT_DB_ROLE"],
+                mount_point=os.environ.get("VAULT_DB_MOUNT", "database"),
+            )
+            st.session_state.db_creds.acquire()
+            st.session_state.db_creds.start()
+
+    # Instantiate the database client with Vault-backed dynamic credentials. The
+    # renewal thread flags a new lease through an event rather than reaching into the
+    # Streamlit session, so the chain is only rebuilt here, on the script thread.
+    lease_changed = st.session_state.db_creds.lease_changed
+    if lease_changed.is_set() or st.session_state.llm_chain is None:
+        lease_changed.clear()
+        previous_chain = st.session_state.llm_chain
+        db_client = _get_db_client(st.session_state.db_creds)
+        st.session_state.llm_chain = _load_few_shot_chain(llm=_get_llm(), db=db_client)
+
+        # Close the pooled connections that belong to the previous lease
+        if previous_chain is not None and previous_chain.database is not db_client:
+            previous_chain.database._engine.dispose()
+
+    # The semantic response cache needs the OpenAI API key, which is only guaranteed
+    # to be available once the LLM has been instantiated.
+    if st.session_state.qa_cache is None:
+        st.session_state.qa_cache = SemanticResponseCache(
+            QA_CACHE_PATH, OpenAIEmbeddings(), threshold=QA_CACHE_THRESHOLD
         )
-        st.session_state.db_creds.acquire()
-        st.session_state.db_creds.start()
-
-    # Instantiate the database client with Vault-backed dynamic credentials
-    db_client = _get_db_client(st.session_state.db_creds)
-    st.session_state.llm_chain = _load_few_shot_chain(llm=_get_llm(), db=db_client)
 
     # Run the streamlit app
     run_streamlit()
@@ -78,8 +101,17 @@ def st_init_session() -> None:
     if "db_creds" not in st.session_state:
         st.session_state.db_creds = None
 
-    if "generated" not in st.session_state:
-        st.session_state["generated"] = []
+    if "llm_chain" not in st.session_state:
+        st.session_state.llm_chain = None
+
+    if "qa_cache" not in st.session_state:
+        st.session_state.qa_cache = None
+
+    # Chat history is kept as parallel lists, one per displayed field, rather than as
+    # the full chain responses.
+    for key in ("results", "sql", "tables_raw", "queries"):
+        if key not in st.session_state:
+            st.session_state[key] = []
 
     if "past" not in st.session_state:
         st.session_state["past"] = []
@@ -93,35 +125,64 @@ def st_init_session() -> None:
     if "query_error" not in st.session_state:
         st.session_state["query_error"] = ""
 
+    if "_parsed_cache" not in st.session_state:
+        st.session_state["_parsed_cache"] = {}
+
 
+# The chain is shared across reruns and is only rebuilt when the model settings or
+# the database engine change, i.e. after a credential rotation.
+@st.cache_resource(
+    max_entries=16,
+    hash_funcs={
+        ChatOpenAI: lambda llm: (llm.model_name, llm.temperature),
+        SQLDatabase: lambda db: db._engine.url.render_as_string(hide_password=True),
+    },
+)
 def _load_few_shot_chain(llm: BaseLanguageModel, db: SQLDatabase) -> SQLDatabaseChain:
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", SYSTEM_PROMPT), ("user", USER_TEMPLATE)]
+    )
     return SQLDatabaseChain.from_llm(
-        llm, db, return_intermediate_steps=True, verbose=False, top_k=3
+        llm, db, prompt=prompt, return_intermediate_steps=True, verbose=False, top_k=3
     )
 
 
 def _get_db_client(db_creds: DynamicDatabaseSecret) -> SQLDatabase:
     if db_creds.credentials is None:
         raise ValueError("Database credentials are not available.")
-    return SQLDatabase.from_uri(
-        PSQL_URI.format(
-            username=db_creds.credentials["username"],
-            password=db_creds.credentials["password"],
-            host=os.environ["DB_HOST"],
-            database=os.environ["DB_NAME"],
-        )
+
+    # Close pooled connections once they are older than the lease duration (minus a
+    # minute); replacements reconnect with the same credentials. This only bounds
+    # connection age: a lease that Vault revokes is handled by rebuilding the chain
+    # and disposing of the old engine in main(), not by recycling.
+    lease_duration = db_creds.lease_duration or 0
+    pool_recycle = lease_duration - 60 if lease_duration > 60 else -1
+    return _sql_database_for(
+        username=db_creds.credentials["username"],
+        password=db_creds.credentials["password"],
+        host=os.environ["DB_HOST"],
+        database=os.environ["DB_NAME"],
+        pool_recycle=pool_recycle,
     )
 
 
-def _update_db_client(
-    db_creds: DynamicDatabaseSecret,
-    thread: Optional[Thread] = None,
-    st_context: Optional[ScriptRunContext] = None,
-) -> None:
-    if thread and st_context:
-        add_script_run_ctx(thread, st_context)
-    if "llm_chain" in st.session_state:
-        st.session_state.llm_chain.database = _get_db_client(db_creds)
+@functools.lru_cache(maxsize=4)
+def _sql_database_for(
+    username: str, password: str, host: str, database: str, pool_recycle: int
+) -> SQLDatabase:
+    """
+    Build the engine and reflect the schema once per set of credentials, rather than
+    on every call.
+    """
+    engine = create_engine(
+        PSQL_URI.format(
+            username=username, password=password, host=host, database=database
+        ),
+        pool_pre_ping=True,
+        pool_size=5,
+        pool_recycle=pool_recycle,
+    )
+    return SQLDatabase(engine=engine)
 
 
 def _get_llm() -> BaseLanguageModel:
@@ -138,8 +199,8 @@ def _get_llm() -> BaseLanguageModel:
                 "Please set the OPENAI_API_KEY environment variable to your OpenAI API key."
             )
 
-    openai = ChatOpenAI(model="gpt-4", temperature=0.3, verbose=True)
-    set_llm_cache(SQLiteCache("openai_cache.db"))
+    openai = ChatOpenAI(model="gpt-4", temperature=0.3, streaming=True, verbose=True)
+    set_llm_cache(WALSQLiteCache("openai_cache.db"))
     return openai
 
 
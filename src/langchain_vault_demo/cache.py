@@ -0,0 +1,230 @@
+# Copyright (c) HashiCorp, Inc.
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import logging
+import sqlite3
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.cache import SQLAlchemyCache, SQLiteCache
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import create_engine, event
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS qa_cache (
+    hash TEXT PRIMARY KEY,
+    embedding BLOB,
+    query TEXT,
+    result_json TEXT
+)"""
+
+# WAL lets concurrent sessions read a cache while another one writes to it, and
+# NORMAL sync avoids an fsync on every commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+class WALSQLiteCache(SQLiteCache):
+    """
+    SQLite-backed LLM cache that opens its connections in WAL mode.
+    """
+
+    def __init__(self, database_path: str = ".langchain.db"):
+        """
+        :param database_path: Path to the SQLite database file
+        """
+        engine = create_engine(
+            f"sqlite:///{database_path}", connect_args={"check_same_thread": False}
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        SQLAlchemyCache.__init__(self, engine)
+
+
+# Result of a cache lookup: the cached response on a hit; on a miss, the question's
+# embedding so that `put` doesn't have to compute it again (None if it failed).
+Lookup = Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]
+
+
+class SemanticResponseCache:
+    """
+    Cache chain responses by question. Repeats are matched on a hash of the
+    normalized question; near-duplicates are matched on the cosine similarity of
+    the question embeddings.
+
+    A near-duplicate hit returns the stored response with a `matched_question` key
+    naming the question it was stored for, so callers can say that it answers a
+    similar question rather than the one asked.
+
+    The cache is best effort: a failed lookup counts as a miss and a failed store is
+    only logged, so cache errors never cost the user an answer.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        embeddings: Embeddings,
+        threshold: float = 0.99,
+    ):
+        """
+        :param database_path: Path to the SQLite database file
+        :param embeddings: Embeddings model used to compare questions
+        :param threshold: Minimum cosine similarity for a semantic cache hit. Keep
+            it strict: questions that differ in a single word (e.g. a nationality or
+            an artist) often score above 0.95 but need a different answer.
+        """
+        self._embeddings = embeddings
+        self._threshold = threshold
+
+        # Every session opens its own connection to the same file
+        self._conn = sqlite3.connect(database_path, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn.execute(CREATE_TABLE_SQL)
+        self._conn.commit()
+
+        # Stored embeddings are loaded once and stacked into a single matrix so that
+        # a lookup is one matrix-vector product.
+        self._hashes: List[str] = []
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._load()
+
+    # Public methods -------------------------------------------------------------------
+    def lookup(self, question: str) -> Lookup:
+        """Look up a single question; see `lookup_many`."""
+        return self.lookup_many([question])[0]
+
+    def lookup_many(self, questions: List[str]) -> List[Lookup]:
+        """
+        Look up several questions. Exact repeats are served first; the remaining
+        questions are embedded together in a single request.
+        """
+        keys = [_normalize(q) for q in questions]
+        results: List[Lookup] = [(None, None)] * len(keys)
+        try:
+            misses = []
+            for i, key in enumerate(keys):
+                row = self._conn.execute(
+                    "SELECT result_json FROM qa_cache WHERE hash = ?", (_hash(key),)
+                ).fetchone()
+                if row is not None:
+                    logging.debug("Exact cache hit for question %r", key)
+                    results[i] = (json.loads(row[0]), None)
+                else:
+                    misses.append(i)
+
+            if misses:
+                vecs = self._embed([keys[i] for i in misses])
+                for i, vec in zip(misses, vecs):
+                    res = self._nearest(keys[i], vec)
+                    results[i] = (res, None) if res is not None else (None, vec)
+        except Exception:
+            # Questions not looked up yet are left as misses
+            logging.exception("Semantic cache lookup failed, treating it as a miss")
+
+        return results
+
+    def put(
+        self,
+        question: str,
+        result: Dict[str, Any],
+        embedding: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Store the response for the question.
+
+        :param embedding: The embedding returned by the lookup, if any
+        """
+        key = _normalize(question)
+        h = _hash(key)
+        try:
+            vec = embedding if embedding is not None else self._embed([key])[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO qa_cache (hash, embedding, query, result_json) "
+                "VALUES (?, ?, ?, ?)",
+                (h, vec.tobytes(), key, json.dumps(result, default=str)),
+            )
+            self._conn.commit()
+
+            if h not in self._hashes:
+                # Raises if the embedding model (and so the dimension) has changed
+                matrix = (
+                    vec[np.newaxis, :]
+                    if len(self._hashes) == 0
+                    else np.vstack([self._matrix, vec])
+                )
+                self._hashes.append(h)
+                self._matrix = matrix
+        except Exception:
+            logging.exception("Could not store response in the semantic cache")
+
+    # Internal methods -----------------------------------------------------------------
+    def _load(self) -> None:
+        rows = self._conn.execute("SELECT hash, embedding FROM qa_cache").fetchall()
+        if len(rows) == 0:
+            return
+
+        # Rows embedded by a different model than most of the cache can't be stacked
+        # with the rest; skip them rather than fail to start.
+        vecs = [(row[0], np.frombuffer(row[1], dtype=np.float32)) for row in rows]
+        dim = Counter(len(vec) for _, vec in vecs).most_common(1)[0][0]
+        vecs = [(h, vec) for h, vec in vecs if len(vec) == dim]
+        if len(vecs) < len(rows):
+            logging.warning(
+                "Skipping %d semantic cache entries with a different embedding size",
+                len(rows) - len(vecs),
+            )
+
+        self._hashes = [h for h, _ in vecs]
+        self._matrix = np.vstack([vec for _, vec in vecs])
+
+    def _nearest(self, key: str, vec: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the response to the most similar stored question, if close enough."""
+        if len(self._hashes) == 0:
+            return None
+
+        scores = self._matrix @ vec
+        best = int(np.argmax(scores))
+        if scores[best] <= self._threshold:
+            return None
+
+        row = self._conn.execute(
+            "SELECT query, result_json FROM qa_cache WHERE hash = ?",
+            (self._hashes[best],),
+        ).fetchone()
+        if row is None:
+            return None
+
+        logging.debug(
+            "Semantic cache hit for question %r (similarity %.3f)", key, scores[best]
+        )
+        res = json.loads(row[1])
+        res["matched_question"] = res.get("query") or row[0]
+        return res
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed the texts in one request and L2-normalize each row."""
+        vecs = np.asarray(self._embeddings.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.where(norms > 0, norms, 1)
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _normalize(question: str) -> str:
+    return question.strip().lower()
+
+
+def _hash(key: str) -> str:
+    return hashlib.blake2b(key.encode()).hexdigest()
@@ -1,17 +1,52 @@
 # Copyright (c) HashiCorp, Inc.
 # SPDX-License-Identifier: MIT
 
-import ast
-import json
 import logging
-import time
+import os
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
-import pandas as pd
+import orjson
 import streamlit as st
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langchain_experimental.sql import SQLDatabaseChain
 from langchain_openai.chat_models.base import ChatOpenAI
 from streamlit.delta_generator import DeltaGenerator
 
-from . import MSG_NO_ANSWER, PROMPT
+from . import MSG_NO_ANSWER
+from .vault import DynamicDatabaseSecret
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_STAR_POOL = "*" * 256
+
+# Shared across sessions; chain invocations are I/O bound (LLM and database calls).
+# Each running question holds a worker until it completes, so this is the number of
+# users that can be answered at the same time: further questions, from any session,
+# queue behind them. Size it for the expected number of concurrent sessions.
+CHAIN_WORKERS = int(os.environ.get("CHAIN_WORKERS", "16"))
+_EXECUTOR = ThreadPoolExecutor(max_workers=CHAIN_WORKERS, thread_name_prefix="chain")
+
+# Static chat tab content, built once at import time
+_HEADER_MD = (
+    "## The Museum of Modern Art (MoMA) Collection\n\n"
+    "Ask a question about the collection using natural language."
+)
+_SAMPLE_QUESTIONS_MD = """
+Enter one question per line to ask several at once. Multiple questions are answered
+concurrently.
+
+- How many artists are there in the collection?
+- How many pieces of artwork are there?
+- How many artists are there whose nationality is Italian?
+- How many artworks are by the artist Claude Monet?
+- How many artworks are classified as paintings?
+- How many artworks were created by Spanish artists?
+- How many artist names start with the letter 'M'?
+"""
 
 
 def run_streamlit() -> None:
@@ -28,8 +63,7 @@ def run_streamlit() -> None:
 
 
 def _clear_session() -> None:
-    for key in st.session_state.keys():
-        del st.session_state[key]
+    st.session_state.clear()
 
 
 def _clear_text() -> None:
@@ -47,79 +81,207 @@ def _set_chat_tab(tab: DeltaGenerator) -> None:
                 st.button("Clear", on_click=_clear_session)
         with col1:
             with st.container():
-                st.markdown("## The Museum of Modern Art (MoMA) Collection")
-                st.markdown(
-                    "Ask a question about the collection using natural language."
-                )
+                st.markdown(_HEADER_MD)
 
                 st.markdown(" ")
                 with st.expander("Sample questions"):
-                    st.markdown(
-                        """
-                        - How many artists are there in the collection?
-                        - How many pieces of artwork are there?
-                        - How many artists are there whose nationality is Italian?
-                        - How many artworks are by the artist Claude Monet?
-                        - How many artworks are classified as paintings?
-                        - How many artworks were created by Spanish artists?
-                        - How many artist names start with the letter 'M'?
-                        """
-                    )
+                    st.markdown(_SAMPLE_QUESTIONS_MD)
 
                 st.markdown(" ")
                 with st.container():
-                    input_text = st.text_input(
+                    input_text = st.text_area(
                         "Ask a question:",
                         "",
                         key="query_text",
                         placeholder="Type your question here...",
+                        help="Enter one question per line to ask several at once.",
                         on_change=_clear_text,
                     )
                     logging.info("Question: %s", input_text)
 
                     user_input = st.session_state["query"]
-                    if user_input:
+                    questions = [
+                        q.strip() for q in user_input.splitlines() if q.strip()
+                    ]
+                    if questions:
                         with st.spinner(text="In progress..."):
-                            st.session_state.past.append(user_input)
+                            st.session_state.past.extend(questions)
                             try:
-                                res = st.session_state.llm_chain.invoke(
-                                    {"query": PROMPT.format(question=user_input)}
-                                )
-                                st.session_state.generated.append(res)
-                                logging.info("Query: %s", st.session_state["query"])
-                                logging.info(
-                                    "Result: %s", st.session_state["generated"]
-                                )
-                            except Exception as exc:
-                                st.session_state.generated.append(MSG_NO_ANSWER)
-                                logging.error("Error: %s", exc)
-                                st.session_state["query_error"] = exc
-
-                    if st.session_state["generated"]:
-                        with col1:
-                            for i in range(
-                                len(st.session_state["generated"]) - 1, -1, -1
-                            ):
-                                if i >= 0:
-                                    with st.chat_message("assistant"):
-                                        if (
-                                            st.session_state["generated"][i]
-                                            == MSG_NO_ANSWER
-                                        ):
-                                            st.write(MSG_NO_ANSWER)
-                                        else:
-                                            st.write(
-                                                st.session_state["generated"][i][
-                                                    "result"
-                                                ]
-                                            )
-                                    with st.chat_message("user"):
-                                        st.write(st.session_state["past"][i])
+                                if len(questions) > 1:
+                                    results = _cached_batch(
+                                        st.session_state.llm_chain, questions
+                                    )
                                 else:
-                                    with st.chat_message("assistant"):
-                                        st.write(MSG_NO_ANSWER)
-                                    with st.chat_message("user"):
-                                        st.write(st.session_state["past"][i])
+                                    # Show tokens as they arrive instead of waiting on
+                                    # the full completion.
+                                    stream = _StreamHandler(st.empty())
+                                    results = [
+                                        _cached_invoke(
+                                            st.session_state.llm_chain,
+                                            questions[0],
+                                            stream=stream,
+                                        )
+                                    ]
+                                    stream.clear()
+                            except Exception as exc:
+                                results = [exc] * len(questions)
+
+                            for question, res in zip(questions, results):
+                                if isinstance(res, Exception):
+                                    _append_result(question, None)
+                                    logging.error("Error: %s", res)
+                                    st.session_state["query_error"] = res
+                                    continue
+
+                                _append_result(question, res)
+                                logging.info("Result: %s", res)
+
+                    for result, past_q in zip(
+                        reversed(st.session_state["results"]),
+                        reversed(st.session_state["past"]),
+                    ):
+                        with st.chat_message("assistant"):
+                            st.write(result)
+                        with st.chat_message("user"):
+                            st.write(past_q)
+
+
+def _append_result(question: str, res: Optional[Dict[str, Any]]) -> None:
+    """
+    Record a chain response in the per-field history lists, keeping only what the
+    chat and details tabs display. A None response records an unanswered question.
+    """
+    if res is None:
+        st.session_state.results.append(MSG_NO_ANSWER)
+        st.session_state.sql.append(None)
+        st.session_state.tables_raw.append(None)
+        st.session_state.queries.append(None)
+        return
+
+    # A near-duplicate cache hit answers a different question; say which one
+    answer = res["result"]
+    matched = res.get("matched_question")
+    if matched is not None:
+        answer = f'{answer}\n\n_Answered from the similar question: "{matched}"_'
+
+    steps = res["intermediate_steps"]
+    st.session_state.results.append(answer)
+    st.session_state.sql.append(steps[1])
+    st.session_state.tables_raw.append(steps[3])
+    st.session_state.queries.append(question)
+
+
+class _StreamHandler(BaseCallbackHandler):
+    """
+    Relay LLM tokens from the chain's worker thread to a Streamlit placeholder. The
+    text is reset at the start of each LLM call, so the SQL query is shown while it
+    is being written and is then replaced by the answer.
+    """
+
+    def __init__(self, placeholder: DeltaGenerator):
+        self._placeholder = placeholder
+        # Tokens are queued by the worker thread and rendered by the script thread;
+        # None marks the start of a new LLM call.
+        self._tokens: queue.Queue[Optional[str]] = queue.Queue()
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], **kwargs
+    ) -> None:
+        self._tokens.put(None)
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs
+    ) -> None:
+        self._tokens.put(None)
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self._tokens.put(token)
+
+    def render_until(self, future: Future) -> None:
+        """Render queued tokens on the script thread until the future completes."""
+        text = ""
+        while not future.done() or not self._tokens.empty():
+            try:
+                token = self._tokens.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            text = "" if token is None else text + token
+            self._placeholder.markdown(text)
+
+    def clear(self) -> None:
+        self._placeholder.empty()
+
+
+def _cached_invoke(
+    chain: SQLDatabaseChain,
+    question: str,
+    stream: Optional[_StreamHandler] = None,
+) -> Dict[str, Any]:
+    """
+    Invoke the chain unless the semantic cache already holds a response to the same
+    (or a near-identical) question.
+    """
+    cache = st.session_state.get("qa_cache")
+    res, embedding = cache.lookup(question) if cache is not None else (None, None)
+    if res is None:
+        res = _invoke_in_background(chain, question, stream)
+        if cache is not None:
+            cache.put(question, res, embedding)
+    return res
+
+
+def _invoke_in_background(
+    chain: SQLDatabaseChain, question: str, stream: Optional[_StreamHandler] = None
+) -> Dict[str, Any]:
+    """
+    Run the chain on the shared executor so the LLM and SQL round trips happen off
+    the Streamlit script thread, which stays free to render streamed tokens.
+    """
+    config: RunnableConfig = {"callbacks": [stream]} if stream is not None else {}
+    future = _EXECUTOR.submit(chain.invoke, {"query": question}, config=config)
+    try:
+        if stream is not None:
+            stream.render_until(future)
+        return future.result()
+    except BaseException:
+        # Streamlit interrupts the script with an exception on rerun or stop; don't
+        # leave the question queued for a worker if it hasn't started yet. A call
+        # that is already running can't be stopped and finishes in the background.
+        future.cancel()
+        raise
+
+
+def _cached_batch(
+    chain: SQLDatabaseChain, questions: List[str]
+) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Answer several questions at once, serving what we can from the semantic cache
+    and answering the rest concurrently; each runs its own chain invocation, up to
+    four at a time. Failed questions are returned as their exception rather than
+    raised.
+    """
+    cache = st.session_state.get("qa_cache")
+    # Questions that miss are embedded in one request rather than one at a time
+    lookups = (
+        cache.lookup_many(questions)
+        if cache is not None
+        else [(None, None)] * len(questions)
+    )
+    results: List[Union[Dict[str, Any], Exception, None]] = [res for res, _ in lookups]
+
+    misses = [i for i, res in enumerate(results) if res is None]
+    if misses:
+        fresh = chain.batch(
+            [{"query": questions[i]} for i in misses],
+            config={"max_concurrency": 4},
+            return_exceptions=True,
+        )
+        for i, res in zip(misses, fresh):
+            results[i] = res
+            if cache is not None and not isinstance(res, Exception):
+                cache.put(questions[i], res, lookups[i][1])
+
+    return results
 
 
 def _set_details_tab(tab: DeltaGenerator) -> None:
@@ -130,37 +292,56 @@ def _set_details_tab(tab: DeltaGenerator) -> None:
                 f"Foundational Model: {_get_model_md(st.session_state.llm_chain)}"
             )
 
-            pos = len(st.session_state["generated"]) - 1
-            if pos >= 0 and st.session_state["generated"][pos] != MSG_NO_ANSWER:
+            pos = len(st.session_state["results"]) - 1
+            if pos >= 0 and st.session_state["sql"][pos] is not None:
+                raw = st.session_state["tables_raw"][pos]
+
                 st.markdown("Query:")
-                st.code(st.session_state["generated"][pos]["query"], language="text")
+                st.code(st.session_state["queries"][pos], language="text")
 
                 st.markdown("SQL Query:")
-                st.code(
-                    st.session_state["generated"][pos]["intermediate_steps"][1],
-                    language="sql",
-                )
+                st.code(st.session_state["sql"][pos], language="sql")
 
                 st.markdown("Results:")
-                st.code(
-                    st.session_state["generated"][pos]["intermediate_steps"][3],
-                    language="python",
-                )
+                st.code(raw, language="python")
 
                 st.markdown("Answer:")
-                st.code(st.session_state["generated"][pos]["result"], language="text")
-
-                data = ast.literal_eval(
-                    st.session_state["generated"][pos]["intermediate_steps"][3]
-                )
-                if len(data) > 0 and len(data[0]) > 1:
+                st.code(st.session_state["results"][pos], language="text")
+
+                # Parsing the results and building the DataFrame is only needed once
+                # per answer, not on every rerun. Only the latest answer is kept, in
+                # the session, so results don't pile up in a process-wide cache.
+                key = (pos, id(raw))
+                cached = st.session_state["_parsed_cache"].get(key)
+                if cached is None:
+                    cached = _parse_results(raw)
+                    st.session_state["_parsed_cache"] = {key: cached}
+                _, df = cached
+                if df is not None:
                     st.markdown("DataFrame:")
-                    st.dataframe(pd.DataFrame(data), use_container_width=False)
+                    st.dataframe(df, use_container_width=False)
 
             st.markdown("Query Error:")
             st.code(st.session_state["query_error"], language="text")
 
 
+def _parse_results(raw: str) -> Tuple[Any, Optional["pd.DataFrame"]]:
+    """
+    Parse the string representation of the SQL results and build a DataFrame when
+    the rows have more than one column.
+    """
+    # Imported lazily to keep them off the startup path; only needed once an answer
+    # is shown in the details tab.
+    import ast
+
+    data = ast.literal_eval(raw)
+    if len(data) > 0 and len(data[0]) > 1:
+        import pandas as pd
+
+        return data, pd.DataFrame(data)
+    return data, None
+
+
 def _set_secrets_tab(tab: DeltaGenerator) -> None:
     with tab:
         with st.container():
@@ -177,35 +358,48 @@ def _set_secrets_tab(tab: DeltaGenerator) -> None:
                     "No database credentials found. Please check your Vault configuration."
                 )
             else:
-                creds_container = st.empty()
-                while st.session_state.db_creds.is_running:
-                    creds_container.empty()
-                    with creds_container:
-                        if st.session_state.db_creds.credentials is None:
-                            st.markdown(
-                                "No database credentials found. Please check your Vault configuration."
-                            )
-                        else:
-                            st.code(
-                                language="json",
-                                body=json.dumps(
-                                    {
-                                        "lease_id": st.session_state.db_creds.lease_id,
-                                        "lease_duration": st.session_state.db_creds.lease_duration,
-                                        "lease_expiration": st.session_state.db_creds.lease_expiration,
-                                        "username": st.session_state.db_creds.credentials[
-                                            "username"
-                                        ],
-                                        "password": _redact_string(
-                                            st.session_state.db_creds.credentials[
-                                                "password"
-                                            ]
-                                        ),
-                                    },
-                                    indent=4,
-                                ),
-                            )
-                    time.sleep(st.session_state.db_creds.next_renew_interval())
+                # Re-render the credentials on the renewal schedule without blocking
+                # the script thread or rerunning the whole app.
+                st.fragment(run_every=st.session_state.db_creds.next_renew_interval())(
+                    _render_db_creds
+                )()
+
+
+def _render_db_creds() -> None:
+    db_creds = st.session_state.db_creds
+    if db_creds is None or db_creds.credentials is None:
+        st.markdown(
+            "No database credentials found. Please check your Vault configuration."
+        )
+        return
+
+    # Kept in the session rather than a process-wide cache, so the (partly redacted)
+    # credentials are only held for the current lease and go away with the session.
+    key = (db_creds.lease_id, db_creds.lease_expiration)
+    cached = st.session_state.get("_creds_json")
+    if cached is None or cached[0] != key:
+        cached = (key, _db_creds_json(*key, db_creds))
+        st.session_state["_creds_json"] = cached
+
+    st.code(language="json", body=cached[1])
+
+
+def _db_creds_json(
+    lease_id: Optional[str], lease_expiration: str, db_creds: DynamicDatabaseSecret
+) -> str:
+    """
+    Serialize the lease details for display. Only rebuilt when the lease is renewed
+    or rotated.
+    """
+    password = _redact_string(db_creds.credentials["password"])
+    payload = {
+        "lease_id": lease_id,
+        "lease_duration": db_creds.lease_duration,
+        "lease_expiration": lease_expiration,
+        "username": db_creds.credentials["username"],
+        "password": password,
+    }
+    return orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode()
 
 
 def _get_model_md(p) -> str:
@@ -216,13 +410,16 @@ def _get_model_md(p) -> str:
     return "Unknown"
 
 
-def _redact_string(str: str, show_chars: int = 5, redact_char: str = "*") -> str:
+def _redact_string(s: str, show_chars: int = 5, redact_char: str = "*") -> str:
     """
-    Redact all but the first and last `show_chars` characters of a string.
+    Redact all but the first `show_chars` characters of a string.
     """
     if (
-        len(str) <= 2 * show_chars
+        len(s) <= 2 * show_chars
     ):  # If the string is too short to redact, return it as is
-        return str
+        return s
 
-    return str[:show_chars] + redact_char * (len(str) - show_chars)
+    n = len(s) - show_chars
+    if redact_char == "*" and n <= len(_STAR_POOL):
+        return s[:show_chars] + _STAR_POOL[:n]
+    return s[:show_chars] + redact_char * n
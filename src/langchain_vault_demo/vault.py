@@ -1,38 +1,263 @@
 # Copyright (c) HashiCorp, Inc.
 # SPDX-License-Identifier: MIT
 
+import atexit
+import contextlib
+import contextvars
 import datetime
+import functools
+import hashlib
+import heapq
+import itertools
 import logging
 import os
+import random
 import threading
-from typing import Any, Callable, Dict, Optional
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from hvac import Client
-from requests import Session
+from requests import PreparedRequest, Request, Response, Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+from urllib3.util.retry import Retry
 
 SIDECAR_TOKEN_PATH = "/vault/secrets/token"
 
+# Lease events carry the lease details both in the message, for the plain-text log
+# format, and as `extra` fields, for structured log handlers to pick up.
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout for every Vault request, so a hung connection can't stall
+# renewal or shutdown for minutes
+VAULT_TIMEOUT = (3.05, 10)
+
+# Shared by every client so that Vault calls reuse warm keep-alive connections instead
+# of paying a TCP+TLS handshake each time. The adapter only retries 502/503/504
+# answers, which come back quickly; timeouts and connection errors are retried by
+# `_with_retry` alone, so the two layers don't multiply.
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    pool_block=False,
+    max_retries=Retry(
+        total=2,
+        connect=0,
+        read=0,
+        status=2,
+        backoff_factor=0.1,
+        status_forcelist=(502, 503, 504),
+    ),
+)
+
+_CORRELATION_ID: ContextVar[str] = ContextVar("correlation_id", default="")
+_SIDECAR_TOKEN_CACHE: Dict[str, Tuple[float, str]] = {}
+
+# How long a token that passed a lookup-self is trusted, in seconds. Keyed by
+# (token hash, Vault address); values are monotonic expiry times.
+AUTH_CACHE_TTL = 30
+_AUTH_CACHE: Dict[Tuple[str, str], float] = {}
+
+# Warning Vault attaches to a renewal once the lease has hit its max TTL
+_CAPPED = "TTL value is capped"
+
+# Upper bound for the backoff between failed attempts to replace a lease, in seconds
+_MAX_REACQUIRE_BACKOFF = 300
+
+# Revocation of a lease that has been rotated out is not on anyone's critical path
+_REVOKE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vault-revoke")
+
+
+def get_vault_client(vault_addr: str) -> Client:
+    # One pooled client is shared by every session; correlation IDs are bound to the
+    # calling context with `correlation_id()` rather than to the client.
+    client = _build_client(vault_addr)
+    token = _read_token()
+    client.token = token
+
+    # A token that passed a lookup-self is trusted for a short while rather than
+    # paying that round trip on every call. A 403 from Vault drops it early.
+    key = (_token_hash(token), vault_addr)
+    expiry = _AUTH_CACHE.get(key)
+    if expiry is None or expiry <= time.monotonic():
+        # The client is shared by every session and lease, so leave its token in
+        # place for their renewals rather than clearing it on a failed lookup.
+        if not client.is_authenticated():
+            _AUTH_CACHE.pop(key, None)
+            raise RuntimeError("Could not find a valid Vault token.")
+        _AUTH_CACHE[key] = time.monotonic() + AUTH_CACHE_TTL
 
-def get_vault_client(vault_addr: str, correlation_id: str) -> Client:
-    # See if we have a token from a Vault Agent sidecar
-    if os.path.exists(SIDECAR_TOKEN_PATH):
-        with open(SIDECAR_TOKEN_PATH, "r") as f:
-            token = f.read().strip()
-    else:
-        token = os.environ.get("VAULT_TOKEN", "")
+    return client
+
+
+@contextlib.contextmanager
+def correlation_id(cid: str) -> Iterator[None]:
+    """
+    Tag every Vault request made within the block, including by renewals started in
+    it, with the given correlation ID.
+    """
+    token = _CORRELATION_ID.set(cid)
+    try:
+        yield
+    finally:
+        _CORRELATION_ID.reset(token)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_client(vault_addr: str) -> Client:
+    rs = _CorrelationSession()
+    rs.headers["Connection"] = "keep-alive"
+    rs.mount("https://", _HTTP_ADAPTER)
+    rs.mount("http://", _HTTP_ADAPTER)
+    rs.hooks["response"].append(functools.partial(_invalidate_auth_on_403, vault_addr))
+
+    # Open one keep-alive connection up front with an unauthenticated health check,
+    # so the first real request (usually acquiring credentials) skips the handshake.
+    try:
+        rs.head(f"{vault_addr}/v1/sys/health", timeout=(3, 3))
+    except Exception as exc:
+        logger.debug("Could not pre-connect to Vault at %s: %s", vault_addr, exc)
+
+    return Client(url=vault_addr, session=rs, timeout=VAULT_TIMEOUT)
+
+
+def _invalidate_auth_on_403(vault_addr: str, resp: Response, **kwargs: Any) -> None:
+    if resp.status_code == 403:
+        token = resp.request.headers.get("X-Vault-Token")
+        if token:
+            _AUTH_CACHE.pop((_token_hash(token), vault_addr), None)
+
+
+def _token_hash(token: str) -> str:
+    # Keep raw tokens out of the cache keys
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+def _read_token() -> str:
+    # See if we have a token from a Vault Agent sidecar; the file is only re-read when
+    # the agent has rewritten it.
+    try:
+        mtime = os.stat(SIDECAR_TOKEN_PATH).st_mtime
+    except FileNotFoundError:
+        return os.environ.get("VAULT_TOKEN", "")
+
+    cached = _SIDECAR_TOKEN_CACHE.get(SIDECAR_TOKEN_PATH)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        token = _read_sidecar_token()
+    except FileNotFoundError:
+        return os.environ.get("VAULT_TOKEN", "")
+    _SIDECAR_TOKEN_CACHE[SIDECAR_TOKEN_PATH] = (mtime, token)
+    return token
+
+
+def _read_sidecar_token() -> str:
+    # The agent rewrites the token file atomically and it is tiny, so a single raw
+    # read is enough and avoids the buffered file object.
+    fd = os.open(SIDECAR_TOKEN_PATH, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096).decode("ascii").strip()
+    finally:
+        os.close(fd)
+
+
+def _with_retry(
+    fn: Callable[..., Any], *args: Any, tries: int = 2, backoff: float = 0.1
+) -> Any:
+    """
+    Call `fn`, retrying on timeouts and connection errors with a jittered
+    exponential backoff.
+
+    Against a Vault that accepts connections but never answers, each attempt costs
+    up to the full VAULT_TIMEOUT (about 13 s), so the default two tries take about
+    26 s. A failed renewal is followed by a reacquire (one more attempt), so one
+    renewal can take about 40 s in the worst case.
+    """
+    for attempt in range(tries):
+        try:
+            return fn(*args)
+        except (Timeout, RequestsConnectionError):
+            if attempt == tries - 1:
+                raise
+            time.sleep(backoff * 2**attempt + random.random() * 0.05)
 
-    client = Client(url=vault_addr, token=token)
 
-    # Make sure that Correlation IDs are passed through
-    rs = Session()
-    rs.headers["X-Correlation-ID"] = correlation_id
-    client.session = rs
+class _CorrelationSession(Session):
+    """
+    Session that tags each request with the correlation ID of the calling context,
+    unless the request already sets one.
+    """
 
-    # Check if we have a valid token
-    if not client.is_authenticated():
-        raise RuntimeError("Could not find a valid Vault token.")
+    def prepare_request(self, request: Request) -> PreparedRequest:
+        prepared = super().prepare_request(request)
+        cid = _CORRELATION_ID.get()
+        if cid:
+            prepared.headers.setdefault("X-Correlation-ID", cid)
+        return prepared
 
-    return client
+
+class _LeaseSnapshot(NamedTuple):
+    """Immutable view of a lease; replaced as a whole whenever the lease changes."""
+
+    lease_id: str
+    lease_duration: int
+    expires_monotonic: float  # Used for scheduling
+    expires_wall: datetime.datetime  # Used for display only
+    expires_iso: str  # expires_wall, formatted once when the snapshot is built
+    renewable: bool
+    credentials: Dict[str, str]
+
+
+def _snapshot_from_response(
+    resp: Dict[str, Any],
+    request_monotonic: float,
+    request_time: datetime.datetime,
+    previous: Optional[_LeaseSnapshot] = None,
+) -> _LeaseSnapshot:
+    """
+    Build a lease snapshot from a Vault credentials or renewal response. Renewal
+    responses carry no credentials, so those are taken from the previous snapshot.
+    """
+    get = resp.get
+
+    # A lease_duration of 0 is meaningful (the lease has run out), so only fall back
+    # to the previous values when a field is missing altogether.
+    lease_duration = get("lease_duration")
+    if lease_duration is None:
+        lease_duration = previous.lease_duration if previous else 0
+    lease_id = get("lease_id")
+    if lease_id is None:
+        lease_id = previous.lease_id if previous else ""
+    credentials = get("data") or (previous.credentials if previous else None)
+    if not isinstance(credentials, dict):
+        raise ValueError(
+            "Invalid credentials format: expected a dictionary, "
+            f"got {type(credentials)}"
+        )
+
+    # Vault keeps answering renewals once the max TTL is reached, but only with the
+    # remaining TTL and a warning; there's no point renewing such a lease again.
+    renewable = bool(get("renewable", previous.renewable if previous else False))
+    warnings = get("warnings")
+    if warnings and _CAPPED in "\x00".join(warnings):
+        renewable = False
+
+    expires_wall = request_time + datetime.timedelta(seconds=lease_duration)
+    return _LeaseSnapshot(
+        lease_id=lease_id,
+        lease_duration=lease_duration,
+        expires_monotonic=request_monotonic + lease_duration,
+        expires_wall=expires_wall,
+        expires_iso=expires_wall.isoformat(),
+        renewable=renewable,
+        credentials=credentials,
+    )
 
 
 class DynamicDatabaseSecret:
@@ -66,38 +291,59 @@ class DynamicDatabaseSecret:
         self._min_interval = min_interval
         self._callback = callback
 
-        self._lease_id: Optional[str] = None
-        self._lease_duration: Optional[int] = None
-        self._lease_expires: Optional[datetime.datetime] = None
-        self._renewable: bool = False
-        self._credentials: Optional[Dict[str, str]] = None
+        # All lease state lives in a single snapshot that is swapped in one assignment,
+        # so readers never see a half-updated lease.
+        self._snapshot: Optional[_LeaseSnapshot] = None
+
+        self._lease_changed = threading.Event()
 
-        self._stop_event = threading.Event()
-        self._renew_thread: Optional[threading.Thread] = None
+        # Renewals run on the shared scheduler thread. `_schedule_seq` identifies this
+        # secret's current entry in the scheduler's queue (None when not scheduled);
+        # `_renew_lock` is held while a renewal is in flight so stop() can wait for it.
+        self._schedule_seq: Optional[int] = None
+        self._renew_lock = threading.RLock()
+        self._context: Optional[contextvars.Context] = None
+        self._next_deadline = 0.0
+        self._renew_interval = float(min_interval)
+        self._failures = 0
+
+        # Teardown may be reached from __exit__, a signal handler and atexit; it must
+        # only stop and revoke once.
+        self._teardown_lock = threading.Lock()
+        self._torn_down = False
 
     # Public properties ----------------------------------------------------------------
+    # Each property loads the snapshot once, so it reads a consistent lease even if
+    # the renewer swaps in a new one (or revoke() clears it) concurrently.
     @property
     def lease_id(self) -> Optional[str]:
-        return self._lease_id
+        snapshot = self._snapshot
+        return snapshot.lease_id if snapshot else None
 
     @property
     def lease_duration(self) -> Optional[int]:
-        return self._lease_duration
+        snapshot = self._snapshot
+        return snapshot.lease_duration if snapshot else None
 
     @property
     def lease_expiration(self) -> str:
         """ISO 8601 formatted string of the lease expiration time."""
-        if self._lease_expires is None:
-            return ""
-        return datetime.datetime.isoformat(self._lease_expires)
+        snapshot = self._snapshot
+        return snapshot.expires_iso if snapshot else ""
 
     @property
     def credentials(self) -> Optional[Dict[str, str]]:
-        return self._credentials
+        snapshot = self._snapshot
+        return snapshot.credentials if snapshot else None
+
+    @property
+    def lease_changed(self) -> threading.Event:
+        """Event set whenever a new lease is acquired; consumers clear it once handled."""
+        return self._lease_changed
 
     @property
     def is_running(self) -> bool:
-        return self._renew_thread is not None and self._renew_thread.is_alive()
+        return self._schedule_seq is not None and _SCHEDULER.is_alive
 
     # Public methods -------------------------------------------------------------------
     def acquire(self) -> Dict[str, str]:
@@ -105,130 +351,216 @@ class DynamicDatabaseSecret:
         Fetch a new credential lease from Vault, replacing any existing one.
         Returns the new credentials dict.
         """
+        return self._do_acquire().credentials
+
+    def start(self) -> None:
+        """Schedule background renewals of the lease."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("Cannot start renewing without an active lease.")
+        if not snapshot.renewable:
+            raise RuntimeError("Lease is not renewable.")
+
+        with self._teardown_lock:
+            self._torn_down = False
+        _STARTED.add(self)
+
+        # Renew in a copy of the caller's context so that renewal requests carry the
+        # same correlation ID.
+        with self._renew_lock:
+            self._context = contextvars.copy_context()
+            self._schedule_seq = _SCHEDULER.schedule(self, self._next_deadline)
+
+    def stop(self) -> None:
+        """
+        Cancel background renewals, waiting for one in flight to finish (about 40 s
+        at worst if Vault stops answering, see `_with_retry`).
+        """
+        with self._renew_lock:
+            self._schedule_seq = None
+
+    def renew_now(self) -> None:
+        """Renew the lease immediately instead of waiting for the next deadline."""
+        with self._renew_lock:
+            if self._schedule_seq is not None:
+                self._schedule_seq = _SCHEDULER.schedule(self, time.monotonic())
+
+    def revoke(self) -> None:
+        """Revoke the active lease so Vault immediately deletes the credential."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        try:
+            _with_retry(self._client.sys.revoke_lease, snapshot.lease_id)
+            logger.info(
+                "vault lease revoked: %s",
+                snapshot.lease_id,
+                extra={"lease_id": snapshot.lease_id},
+            )
+            self._snapshot = None
+        except Exception:
+            logger.exception("Failed to revoke lease %s", snapshot.lease_id)
+
+    # Lease acquisition ----------------------------------------------------------------
+    def _acquire_into_shadow(self) -> _LeaseSnapshot:
+        """
+        Fetch a new lease from Vault and build its snapshot without touching the
+        current one, so readers keep using the old credentials until the swap.
+        """
         try:
+            request_monotonic = time.monotonic()
             request_time = datetime.datetime.now(datetime.timezone.utc)
             resp = self._client.secrets.database.generate_credentials(
                 name=self._role_name,
                 mount_point=self._mount_point,
             )
-            self._lease_id = resp["lease_id"]
-            self._lease_duration = resp["lease_duration"]
-            self._renewable = resp["renewable"]
-            self._lease_expires = request_time + datetime.timedelta(
-                seconds=self._lease_duration or 0
-            )
-            self._credentials = resp["data"]
         except Exception as exc:
-            logging.exception("Failed to acquire new database credentials: %s", exc)
+            logger.exception("Failed to acquire new database credentials: %s", exc)
             raise
 
-        if not isinstance(self._credentials, dict):
-            raise ValueError(
-                "Invalid credentials format: expected a dictionary, got %s",
-                type(self._credentials),
-            )
-
-        logging.info(
-            "Acquired new lease %s with duration %d seconds",
-            self._lease_id,
-            self._lease_duration,
+        snapshot = _snapshot_from_response(resp, request_monotonic, request_time)
+        logger.info(
+            "vault lease acquired: %s (%d seconds)",
+            snapshot.lease_id,
+            snapshot.lease_duration,
+            extra={
+                "lease_id": snapshot.lease_id,
+                "lease_duration": snapshot.lease_duration,
+            },
         )
+        return snapshot
 
-        return self._credentials
-
-    def start(self) -> None:
-        """Start the renewer thread."""
-        if self._lease_id is None:
-            raise RuntimeError("Cannot start renewer thread without an active lease.")
-        if not self._renewable:
-            raise RuntimeError("Lease is not renewable.")
-
-        self._stop_event.clear()
-        self._renew_thread = threading.Thread(target=self._renew_loop, daemon=True)
-        self._renew_thread.start()
+    def _do_acquire(self) -> _LeaseSnapshot:
+        """
+        Fetch a new lease and swap it in. Safe to call from the renewer thread; the
+        next renewal is scheduled for the new lease.
+        """
+        snapshot = self._acquire_into_shadow()
+        self._snapshot = snapshot
+        self._lease_changed.set()
+        self._reschedule()
+        return snapshot
 
-    def stop(self) -> None:
-        """Stop the renewer thread and wait for it to finish."""
-        self._stop_event.set()
-        if self._renew_thread:
-            try:
-                self._renew_thread.join()
-            except RuntimeError as exc:
-                if "cannot join current thread" not in str(exc):
-                    raise
-                pass
+    def _revoke_in_background(self, lease_id: str) -> None:
+        """Revoke a lease that has been rotated out, off the renewer thread."""
 
-    def revoke(self) -> None:
-        """Revoke the active lease so Vault immediately deletes the credential."""
-        if self._lease_id:
+        def _revoke() -> None:
             try:
-                self._client.sys.revoke_lease(self._lease_id)
-                logging.info("Revoked lease %s", self._lease_id)
-                self._lease_id = None
-                self._lease_duration = None
-                self._lease_expires = None
-                self._renewable = False
-                self._credentials = None
+                _with_retry(self._client.sys.revoke_lease, lease_id)
+                logger.info(
+                    "vault lease revoked: %s", lease_id, extra={"lease_id": lease_id}
+                )
             except Exception:
-                logging.exception("Failed to revoke lease %s", self._lease_id)
+                logger.exception("Failed to revoke lease %s", lease_id)
 
-    # Renew loop -----------------------------------------------------------------------
+        _REVOKE_EXECUTOR.submit(contextvars.copy_context().run, _revoke)
+
+    # Renewal --------------------------------------------------------------------------
     def next_renew_interval(self) -> float:
         """
-        How long to wait before attempting renewal. Recomputed each loop so
-        if lease_duration was updated on renew, we adapt.
+        How long to wait before attempting renewal. Updated whenever the lease is
+        acquired or renewed, so if lease_duration changed on renew, we adapt.
         """
-        return max(self._renew_pct * (self._lease_duration or 0), self._min_interval)
+        return self._renew_interval
 
-    def _renew_loop(self) -> None:
+    def _reschedule(self, delay: Optional[float] = None) -> None:
+        """
+        Recompute the renewal interval for the current lease and set the next
+        deadline, or retry after `delay` seconds. Called whenever the lease is
+        acquired or renewed; if renewals are running, the new deadline replaces the
+        queued one.
+        """
+        snapshot = self._snapshot
+        if delay is not None:
+            self._next_deadline = time.monotonic() + delay
+        elif snapshot is None:
+            self._next_deadline = time.monotonic() + self._renew_interval
+        else:
+            lease_duration = snapshot.lease_duration or 0
+            self._renew_interval = max(
+                self._renew_pct * lease_duration, self._min_interval
+            )
+            # Measure the renewal interval from when the lease was requested, on the
+            # monotonic clock so that wall-clock adjustments don't move it.
+            issued = snapshot.expires_monotonic - lease_duration
+            self._next_deadline = issued + self._renew_interval
+
+        with self._renew_lock:
+            if self._schedule_seq is not None:
+                self._schedule_seq = _SCHEDULER.schedule(self, self._next_deadline)
+
+    def _run_scheduled(self, seq: int) -> None:
+        """Entry point for the scheduler; skips entries that have been superseded."""
+        with self._renew_lock:
+            if seq != self._schedule_seq or self._context is None:
+                return
+            self._context.run(self._renew_once)
+
+    def _renew_once(self) -> None:
         """
-        Background-renewer thread:
-        - wait until it's time to renew,
         - try renewing;
-        - if renewal fails, attempt a full new acquire() instead;
-        - repeat until stopped.
+        - if renewal fails, acquire a new lease in place, backing off on failure.
+        Either way the next renewal is queued before returning.
         """
-        while not self._stop_event.wait(timeout=self.next_renew_interval()):
-            try:
-                if not self._renewable:
-                    raise RuntimeError(f"Lease {self._lease_id} is not renewable")
+        snapshot = self._snapshot
+        try:
+            if snapshot is None or not snapshot.renewable:
+                raise RuntimeError(f"Lease {self.lease_id} is not renewable")
 
-                # Request lease renewal
-                request_time = datetime.datetime.now(datetime.timezone.utc)
-                resp = self._client.sys.renew_lease(self._lease_id)
+            # Request lease renewal
+            request_monotonic = time.monotonic()
+            request_time = datetime.datetime.now(datetime.timezone.utc)
+            resp = _with_retry(self._client.sys.renew_lease, snapshot.lease_id)
 
-                # Update internal lease state
-                self._lease_duration = resp.get("lease_duration", self._lease_duration)
-                self._lease_expires = request_time + datetime.timedelta(
-                    seconds=self._lease_duration or 0
-                )
-                logging.info(
-                    "Renewed lease %s for the next %d seconds",
-                    self._lease_id,
-                    self._lease_duration,
+            # Update lease state
+            previous = snapshot
+            snapshot = _snapshot_from_response(
+                resp, request_monotonic, request_time, previous=previous
+            )
+            if previous.renewable and not snapshot.renewable:
+                logger.warning(
+                    "Lease %s has reached its max TTL and is no longer renewable",
+                    snapshot.lease_id,
                 )
 
-                # Check if the lease is still renewable
-                if "warnings" in resp and isinstance(resp["warnings"], list):
-                    if any("TTL value is capped" in w for w in resp["warnings"]):
-                        self._renewable = False
-                        logging.warning(
-                            "Lease %s has reached its max TTL and is no longer renewable",
-                            self._lease_id,
-                        )
+            self._snapshot = snapshot
+            self._failures = 0
+            self._reschedule()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "vault lease renewed: %s (%d seconds)",
+                    snapshot.lease_id,
+                    snapshot.lease_duration,
+                    extra={
+                        "lease_id": snapshot.lease_id,
+                        "lease_duration": snapshot.lease_duration,
+                    },
+                )
+        except Exception as exc:
+            # renewal failed → lease expired or otherwise invalid → get a fresh one
+            logger.error("Could not renew lease %s: %s", self.lease_id, exc)
+            try:
+                self._do_acquire()
             except Exception as exc:
-                # renewal failed → lease expired or otherwise invalid → get a fresh one
-                logging.error("Could not renew lease %s: %s", self._lease_id, exc)
-                try:
-                    self.stop()
-                    self.acquire()
-                    self.start()
-                except Exception as exc:
-                    logging.error("Failed to get new credentials, giving up: %s", exc)
-                    break
-
-                if self._callback:
-                    self._callback(creds=self, thread=self._renew_thread)
+                delay = min(
+                    self._min_interval * 2**self._failures, _MAX_REACQUIRE_BACKOFF
+                )
+                self._failures += 1
+                logger.error(
+                    "Failed to get new credentials, retrying in %d seconds: %s",
+                    delay,
+                    exc,
+                )
+                self._reschedule(delay=delay)
+                return
+            self._failures = 0
+
+            # The new lease is already in place; drop the old one asynchronously
+            if snapshot is not None:
+                self._revoke_in_background(snapshot.lease_id)
+
+            if self._callback:
+                self._callback(creds=self, thread=threading.current_thread())
 
     # Context manager ------------------------------------------------------------------
     def __enter__(self) -> "DynamicDatabaseSecret":
@@ -238,12 +570,95 @@ class DynamicDatabaseSecret:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        # tear down: stop renewing, then revoke
+        self._teardown()
+
+    # Teardown -------------------------------------------------------------------------
+    def _teardown(self) -> None:
+        """Stop renewing, then revoke. Idempotent, so racing callers only do it once."""
+        with self._teardown_lock:
+            if self._torn_down:
+                return
+            self._torn_down = True
+        _STARTED.discard(self)
         self.stop()
         self.revoke()
 
     # Signal handling ------------------------------------------------------------------
     def _signal_handler(self, signum: int, frame: Any) -> None:
-        logging.info("Received signal %d, stopping renewer thread", signum)
-        self.stop()
-        self.revoke()
+        logger.info("Received signal %d, stopping lease renewals", signum)
+        self._teardown()
+
+
+class _RenewScheduler:
+    """
+    Single background thread that renews every started lease when it is due, so the
+    number of threads doesn't grow with the number of leases. Pending renewals are
+    kept in a min-heap ordered by monotonic deadline.
+
+    Renewals run one at a time, so while Vault is unresponsive each due lease holds
+    up the rest for as long as its renewal takes (about 40 s, see `_with_retry`).
+    """
+
+    def __init__(self):
+        self._cv = threading.Condition()
+        self._heap: List[Tuple[float, int, "weakref.ReferenceType[Any]"]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_alive(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def schedule(self, secret: "DynamicDatabaseSecret", deadline: float) -> int:
+        """
+        Queue a renewal of `secret` at `deadline` and return the entry's sequence
+        number. Older entries for the same secret are skipped when they come due.
+        Secrets are held weakly, so garbage collection cancels their renewals.
+        """
+        with self._cv:
+            seq = next(self._seq)
+            heapq.heappush(self._heap, (deadline, seq, weakref.ref(secret)))
+            if not self.is_alive:
+                self._thread = threading.Thread(
+                    target=self._run, name="vault-renewer", daemon=True
+                )
+                self._thread.start()
+            self._cv.notify_all()
+        return seq
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while True:
+                    if not self._heap:
+                        self._cv.wait()
+                        continue
+                    remaining = self._heap[0][0] - time.monotonic()
+                    if remaining <= 0:
+                        _, seq, ref = heapq.heappop(self._heap)
+                        break
+                    self._cv.wait(timeout=remaining)
+
+            # Renew outside the lock so that scheduling never waits on Vault
+            secret = ref()
+            if secret is None:
+                continue
+            try:
+                secret._run_scheduled(seq)
+            except Exception:
+                logger.exception("Unexpected error while renewing lease")
+
+
+_SCHEDULER = _RenewScheduler()
+
+
+# Secrets that have been started and not torn down yet. Held weakly so that tracking
+# them for shutdown does not keep them alive.
+_STARTED: "weakref.WeakSet[DynamicDatabaseSecret]" = weakref.WeakSet()
+
+
+@atexit.register
+def _teardown_at_exit() -> None:
+    for secret in list(_STARTED):
+        secret._teardown()